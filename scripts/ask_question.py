@@ -13,12 +13,20 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(levelname)s:%(name)s:%(message)s'
 )
+# Per-request httpx logs would otherwise interleave with the streamed answer
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
 load_dotenv()
 
 query = input('Enter your question: ')
 
-embedder = EmbeddingManager()
+cache = None
+if os.environ.get('REDIS_URL'):
+    from redis import Redis
+
+    cache = Redis.from_url(os.environ['REDIS_URL'])
+
+embedder = EmbeddingManager(cache=cache)
 vector_store = VectorStoreManager(
     mongodb_uri=os.environ['MONGODB_URI'],
     db_name='doctalk',
@@ -30,10 +38,20 @@ agent = RAGAgent(embedder, vector_store)
 print(f'\nQuestion: {query}\n')
 print('Thinking...\n')
 
-answer = agent.ask(query)
+answer_started = False
+
+
+def print_token(token: str) -> None:
+    """Print a streamed piece of the answer, preceded by the header on the first one."""
+    global answer_started
+    if not answer_started:
+        print('Answer:')
+        answer_started = True
+    print(token, end='', flush=True)
+
 
-print('Answer:')
-print(answer.text)
+answer = agent.ask(query, on_token=print_token)
+print()
 
 if answer.citations:
     print('\n' + '=' * 60)
@@ -17,6 +17,9 @@ Usage Examples:
     # Clear existing chunks and upload new documents
     uv run python scripts/upload_documents.py --clear sample_documents/
 
+    # Split with the offset-based splitter (useful for PDFs extracted without line breaks)
+    uv run python scripts/upload_documents.py --fast-split large_document.pdf
+
     # Mix files and directories
     uv run python scripts/upload_documents.py file1.pdf sample_documents/ file2.docx
 """
@@ -39,6 +42,7 @@ logging.basicConfig(
 load_dotenv()
 
 SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.md', '.docx'}
+MAX_WORKERS = 8
 
 
 def get_files_from_path(path: str) -> list[str]:
@@ -78,6 +82,11 @@ def main():
         action='store_true',
         help='Clear existing chunks before uploading',
     )
+    parser.add_argument(
+        '--fast-split',
+        action='store_true',
+        help='Use the offset-based splitter (much faster on long texts without newlines)',
+    )
 
     args = parser.parse_args()
 
@@ -86,8 +95,14 @@ def main():
         mongodb_uri=os.environ['MONGODB_URI'],
         db_name='doctalk',
         collection_name='chunks',
+        max_pool_size=MAX_WORKERS,
+    )
+    pipeline = IngestionPipeline(
+        embedder,
+        vector_store,
+        max_workers=MAX_WORKERS,
+        fast_split=args.fast_split,
     )
-    pipeline = IngestionPipeline(embedder, vector_store)
 
     if args.clear:
         vector_store.collection.delete_many({})
@@ -111,12 +126,11 @@ def main():
         print(f'  - {f}')
 
     print('\nUploading...')
-    for file_path in all_files:
-        try:
-            pipeline.ingest(file_path)
+    for file_path, error in pipeline.ingest_batch(all_files):
+        if error is None:
             print(f'✓ {Path(file_path).name}')
-        except Exception as e:
-            print(f'✗ {Path(file_path).name}: {e}')
+        else:
+            print(f'✗ {Path(file_path).name}: {error}')
 
     print('\nUpload complete!')
 
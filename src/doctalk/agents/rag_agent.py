@@ -1,15 +1,58 @@
 """Simple LangGraph agent for RAG."""
-from typing import TypedDict
+from collections.abc import Callable
+from typing import Any, TypedDict
 
+import numpy as np
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel
 
 from doctalk.embedding import EmbeddingManager
-from doctalk.models import Answer, Citation, RetrievedChunk
+from doctalk.http_client import get_http_client
+from doctalk.models import Answer, Citation
 from doctalk.storage import VectorStoreManager
 
 
+ANSWER_PROMPT = """You are a helpful assistant that answers questions based only on the provided context.
+
+Context:
+{context}
+
+Question: {query}
+
+Instructions:
+- Answer the question using only the information from the context above
+- If the context doesn't contain enough information, say so clearly
+{citation_instructions}- Be concise and accurate
+
+{closing}"""
+
+# Only used when the answer and its chunk references come from a single structured call
+CITATION_INSTRUCTIONS = """- In your response, specify which chunk numbers (1, 2, 3, etc.) you used to construct your answer
+- Only include chunk numbers that you actually used to answer the question
+"""
+
+
+def _rerank(query_embedding: list[float], chunk_dicts: list[dict[str, Any]], top_k: int) -> list[dict[str, Any]]:
+    """Rerank candidates by exact cosine similarity against their full-precision embeddings.
+
+    :param query_embedding: Query vector embedding
+    :param chunk_dicts: Candidate chunks, each with a float32 'embedding' array
+    :param top_k: Number of chunks to keep
+    :return: Top `top_k` chunks, best first, with 'score' replaced by the exact similarity
+    """
+    if not chunk_dicts:
+        return []
+
+    matrix = np.stack([chunk['embedding'] for chunk in chunk_dicts])
+    query = np.asarray(query_embedding, dtype=np.float32)
+    cosine = (matrix @ query) / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-8)
+
+    # Report scores on the same (1 + cosine) / 2 scale as Atlas vectorSearchScore
+    top = np.argsort(-cosine)[:top_k]
+    return [{**chunk_dicts[i], 'score': float((1 + cosine[i]) / 2)} for i in top]
+
+
 class LLMResponse(BaseModel):
     """Structured response from LLM."""
 
@@ -17,11 +60,19 @@ class LLMResponse(BaseModel):
     referenced_chunk_numbers: list[int]
 
 
+class ChunkReferences(BaseModel):
+    """Structured list of chunks used in an already generated answer."""
+
+    referenced_chunk_numbers: list[int]
+
+
 class AgentState(TypedDict):
     """State for the RAG agent."""
     query: str
-    retrieved_chunks: list[RetrievedChunk]
+    retrieved_chunks: list[dict[str, Any]]
     answer: Answer
+    on_token: Callable[[str], None] | None
+    document_ids: list[str] | None
 
 
 class RAGAgent:
@@ -32,16 +83,32 @@ class RAGAgent:
         embedder: EmbeddingManager,
         vector_store: VectorStoreManager,
         llm_model: str = 'gpt-4o-mini',
+        top_k: int = 5,
+        rerank_candidates: int | None = None,
+        high_recall: bool = False,
+        min_relevance: float = 0.6,
     ):
         """Initialize the RAG agent.
 
         :param embedder: EmbeddingManager instance
         :param vector_store: VectorStoreManager instance
         :param llm_model: OpenAI LLM model name
+        :param top_k: Number of chunks passed to the LLM
+        :param rerank_candidates: If set, fetch this many candidates (at least top_k) and rerank them by exact
+            cosine similarity
+        :param high_recall: Search with 15x the limit as numCandidates instead of the vector store default
+        :param min_relevance: Answer without calling the LLM when no chunk scores at least this much.
+            Scores are on Atlas's (1 + cosine) / 2 scale, so 0.6 corresponds to a cosine similarity of 0.2
         """
         self.embedder = embedder
         self.vector_store = vector_store
-        self.llm = ChatOpenAI(model=llm_model, temperature=0).with_structured_output(LLMResponse)
+        self.top_k = top_k
+        self.rerank_candidates = rerank_candidates
+        self.high_recall = high_recall
+        self.min_relevance = min_relevance
+        self.chat_llm = ChatOpenAI(model=llm_model, temperature=0, http_client=get_http_client())
+        self.llm = self.chat_llm.with_structured_output(LLMResponse)
+        self.citation_llm = self.chat_llm.with_structured_output(ChunkReferences)
 
         self.graph = self._build_graph()
 
@@ -52,27 +119,38 @@ class RAGAgent:
         :return: Updated state with retrieved chunks
         """
         query = state['query']
+        document_ids = state['document_ids']
+        if document_ids is not None and not document_ids:
+            # Restricted to an empty set of documents: nothing can match
+            state['retrieved_chunks'] = []
+            return state
+
         query_embedding = self.embedder.embed(query)
-        chunk_dicts = self.vector_store.vector_search(query_embedding, limit=5)
-
-        # Convert dicts to RetrievedChunk objects
-        retrieved_chunks = [
-            RetrievedChunk(
-                chunk_id=str(chunk.get('_id', '')),
-                text=chunk.get('text', ''),
-                document_name=chunk.get('document_name', 'Unknown'),
-                document_id=chunk.get('document_id', ''),
-                chunk_index=chunk.get('chunk_index', 0),
-                score=chunk.get('score', 0.0),
-                metadata=chunk.get('metadata', {}),
+        # Never fetch fewer candidates than the number of chunks the LLM should get
+        limit = max(self.rerank_candidates, self.top_k) if self.rerank_candidates else self.top_k
+        num_candidates = limit * 15 if self.high_recall else None
+        pre_filter = {'document_id': {'$in': document_ids}} if document_ids is not None else None
+
+        if self.rerank_candidates:
+            chunk_dicts = self.vector_store.vector_search_with_embeddings(
+                query_embedding,
+                limit=limit,
+                num_candidates=num_candidates,
+                pre_filter=pre_filter,
+            )
+            chunk_dicts = _rerank(query_embedding, chunk_dicts, self.top_k)
+        else:
+            chunk_dicts = self.vector_store.vector_search(
+                query_embedding,
+                limit=limit,
+                num_candidates=num_candidates,
+                pre_filter=pre_filter,
             )
-            for chunk in chunk_dicts
-        ]
 
-        state['retrieved_chunks'] = retrieved_chunks
+        # Chunks stay as dicts (chunk_id, text, document_name, ...); only Citation models leave the agent
+        state['retrieved_chunks'] = chunk_dicts
         return state
 
-
     def _generate_answer_node(self, state: AgentState) -> AgentState:
         """Node that generates answer from retrieved chunks.
 
@@ -82,65 +160,90 @@ class RAGAgent:
         query = state['query']
         chunks = state['retrieved_chunks']
 
-        if not chunks:
+        # Skip the LLM when nothing relevant was retrieved
+        top_score = max((chunk['score'] for chunk in chunks), default=0.0)
+        if not chunks or top_score < self.min_relevance:
             state['answer'] = Answer(
                 text='I could not find any relevant information to answer your question.',
                 citations=[],
             )
+            if state['on_token'] is not None:
+                state['on_token'](state['answer'].text)
             return state
 
-        # Number chunks 1, 2, 3... for the LLM prompt
-        # Create lookup: chunk_number_in_prompt -> actual_chunk_object
-        # Example: If LLM says "I used chunk [2]", this tells us which chunk that is
-        chunk_number_to_chunk: dict[int, RetrievedChunk] = {}
-        context_parts = []
-        for chunk_number, chunk in enumerate(chunks, start=1):
-            chunk_number_to_chunk[chunk_number] = chunk
-            context_parts.append(f'[{chunk_number}] {chunk.text}')
-
-        context = '\n\n'.join(context_parts)
-
-        prompt = f"""You are a helpful assistant that answers questions based only on the provided context.
-
-Context:
-{context}
-
-Question: {query}
-
-Instructions:
-- Answer the question using only the information from the context above
-- If the context doesn't contain enough information, say so clearly
-- In your response, specify which chunk numbers (1, 2, 3, etc.) you used to construct your answer
-- Only include chunk numbers that you actually used to answer the question
-- Be concise and accurate
+        # Number chunks 1, 2, 3... for the LLM prompt; chunk number n refers to chunks[n - 1]
+        context = '\n\n'.join(
+            f'[{chunk_number}] {chunk["text"]}' for chunk_number, chunk in enumerate(chunks, start=1)
+        )
 
-Answer the question and specify which chunks you used:"""
+        if state['on_token'] is not None:
+            answer_text, referenced_chunk_numbers = self._stream_answer(query, context, state['on_token'])
+        else:
+            prompt = ANSWER_PROMPT.format(
+                context=context,
+                query=query,
+                citation_instructions=CITATION_INSTRUCTIONS,
+                closing='Answer the question and specify which chunks you used:',
+            )
 
-        response: LLMResponse = self.llm.invoke(prompt)
+            response: LLMResponse = self.llm.invoke(prompt)
+            answer_text, referenced_chunk_numbers = response.answer, response.referenced_chunk_numbers
 
         # Build citations: map LLM's chunk numbers (1, 2, 3...) back to actual chunks
         citations = []
-        for chunk_number in response.referenced_chunk_numbers:
-            if chunk_number not in chunk_number_to_chunk:
+        for chunk_number in referenced_chunk_numbers:
+            if not 1 <= chunk_number <= len(chunks):
                 continue
 
-            chunk = chunk_number_to_chunk[chunk_number]
+            chunk = chunks[chunk_number - 1]
 
-            text_excerpt = chunk.text[:100] + '...' if len(chunk.text) > 100 else chunk.text
+            text = chunk['text']
+            text_excerpt = text[:100] + '...' if len(text) > 100 else text
             citations.append(
                 Citation(
-                    chunk_id=chunk.chunk_id,
-                    document_name=chunk.document_name,
+                    chunk_id=chunk['chunk_id'],
+                    document_name=chunk['document_name'],
                     text_excerpt=text_excerpt,
                 )
             )
 
         state['answer'] = Answer(
-            text=response.answer,
+            text=answer_text,
             citations=citations,
         )
         return state
 
+    def _stream_answer(self, query: str, context: str, on_token: Callable[[str], None]) -> tuple[str, list[int]]:
+        """Stream the answer text, then ask which chunks it used.
+
+        Structured output cannot be streamed, so the answer is generated as plain text first and the
+        chunk references are extracted with a second, short structured call.
+
+        :param query: User question
+        :param context: Numbered chunks
+        :param on_token: Callback receiving each streamed piece of the answer
+        :return: Answer text and the chunk numbers it used
+        """
+        prompt = ANSWER_PROMPT.format(context=context, query=query, citation_instructions='', closing='Answer:')
+
+        answer_parts = []
+        for message_chunk in self.chat_llm.stream(prompt):
+            if message_chunk.content:
+                on_token(message_chunk.content)
+                answer_parts.append(message_chunk.content)
+        answer_text = ''.join(answer_parts)
+
+        citation_prompt = f"""Given the context chunks and an answer written from them, list only the chunk numbers \
+(1, 2, 3, etc.) whose information was used in the answer.
+
+Context:
+{context}
+
+Answer: {answer_text}"""
+
+        references: ChunkReferences = self.citation_llm.invoke(citation_prompt)
+        return answer_text, references.referenced_chunk_numbers
+
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph agent graph.
 
@@ -157,16 +260,26 @@ Answer the question and specify which chunks you used:"""
 
         return workflow.compile()
 
-    def ask(self, query: str) -> Answer:
+    def ask(
+        self,
+        query: str,
+        on_token: Callable[[str], None] | None = None,
+        document_ids: list[str] | None = None,
+    ) -> Answer:
         """Ask a question and get an answer with citations.
 
         :param query: User question
+        :param on_token: If set, the answer is streamed and each piece of text is passed to this callback
+            as it is generated; citations are resolved after the answer completes
+        :param document_ids: If set, only search chunks of these documents (an empty list matches nothing)
         :return: Answer with text and citations
         """
         initial_state: AgentState = {
             'query': query,
             'retrieved_chunks': [],
             'answer': Answer(text='', citations=[]),
+            'on_token': on_token,
+            'document_ids': document_ids,
         }
 
         result = self.graph.invoke(initial_state)
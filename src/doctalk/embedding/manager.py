@@ -1,29 +1,88 @@
+import asyncio
+import functools
+import hashlib
 import logging
+from array import array
+from typing import TYPE_CHECKING
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+from doctalk.http_client import get_http_client, new_async_http_client
+
+if TYPE_CHECKING:
+    from redis import Redis
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_MODEL = 'text-embedding-3-small'
+EMBED_BATCH_SIZE = 256
+EMBED_MAX_CONCURRENCY = 4
+EMBED_CACHE_SIZE = 4096
+EMBED_CACHE_TTL = 86400
 
 class EmbeddingManager:
     """Manages embedding generation for text."""
 
-    def __init__(self, model: str | None = None, api_key: str | None = None):
+    def __init__(
+        self,
+        model: str | None = None,
+        api_key: str | None = None,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        cache_size: int = EMBED_CACHE_SIZE,
+        cache: 'Redis | None' = None,
+        cache_ttl: int = EMBED_CACHE_TTL,
+    ):
         """Initialize the embedding manager.
 
         :param model: OpenAI embedding model name (defaults to DEFAULT_MODEL)
         :param api_key: OpenAI API key (if None, uses OPENAI_API_KEY env var)
+        :param batch_size: Maximum number of texts sent in a single embedding request
+        :param max_concurrency: Maximum number of sub-batch requests in flight per embed_batch call
+        :param cache_size: Number of single-text embeddings kept in the in-process LRU cache
+        :param cache: Optional Redis client used as a shared embedding cache across processes
+        :param cache_ttl: Expiry of Redis cache entries in seconds
         """
         self.model = model or DEFAULT_MODEL
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.client = OpenAI(api_key=api_key, http_client=get_http_client())
+        self._embed_cached = functools.lru_cache(maxsize=cache_size)(self._embed_uncached)
 
     def embed(self, text: str) -> list[float]:
         """Generate embedding for a single text string.
 
+        Results are cached in-process and, if configured, in Redis.
+
         :param text: Text to embed
         :return: Embedding vector
         """
+        # The LRU holds immutable tuples; hand each caller its own list
+        return list(self._embed_cached(text))
+
+    def _embed_uncached(self, text: str) -> tuple[float, ...]:
+        """Generate embedding for a single text string, consulting only the Redis cache.
+
+        Redis errors are logged and treated as cache misses, so an unavailable cache never fails a query.
+
+        :param text: Text to embed
+        :return: Embedding vector
+        """
+        if self.cache is not None:
+            cache_key = self._cache_key(text)
+            try:
+                cached = self.cache.get(cache_key)
+            except Exception:
+                logger.warning('Embedding cache read failed; calling the embedding API', exc_info=True)
+                cached = None
+            if cached is not None:
+                embedding = array('f')
+                embedding.frombytes(cached)
+                return tuple(embedding)
+
         response = self.client.embeddings.create(
             model=self.model,
             input=text,
@@ -34,25 +93,71 @@ class EmbeddingManager:
             f'(model: {self.model})'
         )
 
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if self.cache is not None:
+            try:
+                self.cache.setex(cache_key, self.cache_ttl, array('f', embedding).tobytes())
+            except Exception:
+                logger.warning('Embedding cache write failed', exc_info=True)
+
+        return tuple(embedding)
+
+    def _cache_key(self, text: str) -> str:
+        """Build the Redis cache key for a text.
+
+        :param text: Text to embed
+        :return: Cache key derived from the model name and a SHA-256 of the text
+        """
+        digest = hashlib.sha256(f'{self.model}:{text}'.encode()).hexdigest()
+        return f'doctalk:embedding:{digest}'
 
     def embed_batch(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings for multiple text strings.
 
+        Texts are split into sub-batches of `batch_size`, with at most `max_concurrency` requests in flight.
+        The requests run on a private event loop, so this must not be called from a running event loop
+        (e.g. inside an async web handler); call it from a worker thread there instead.
+
         :param texts: List of text strings to embed
         :return: List of embedding vectors
+        :raises RuntimeError: If called from a running event loop
         """
         if not texts:
             return []
 
-        response = self.client.embeddings.create(
-            model=self.model,
-            input=texts,
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._aembed_batch(texts))
+
+        raise RuntimeError(
+            'EmbeddingManager.embed_batch cannot be called from a running event loop; '
+            'run it in a worker thread (e.g. asyncio.to_thread) instead'
         )
 
+    async def _aembed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Embed sub-batches of texts concurrently.
+
+        :param texts: List of text strings to embed
+        :return: List of embedding vectors, in the same order as texts
+        """
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        # Bound in-flight requests to stay under the API's tokens-per-minute limit
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # The async client is scoped to this event loop; asyncio.run creates a new loop per call
+        async with AsyncOpenAI(api_key=self.api_key, http_client=new_async_http_client()) as aclient:
+
+            async def embed_one(batch: list[str]):
+                async with semaphore:
+                    return await aclient.embeddings.create(model=self.model, input=batch)
+
+            responses = await asyncio.gather(*(embed_one(batch) for batch in batches))
+
+        total_tokens = sum(response.usage.total_tokens for response in responses)
         logger.info(
-            f'Embedding batch call: {response.usage.total_tokens} tokens '
-            f'for {len(texts)} chunks (model: {self.model})'
+            f'Embedding batch call: {total_tokens} tokens '
+            f'for {len(texts)} chunks in {len(batches)} requests (model: {self.model})'
         )
 
-        return [item.embedding for item in response.data]
+        return [item.embedding for response in responses for item in response.data]
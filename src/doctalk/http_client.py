@@ -0,0 +1,29 @@
+"""Shared HTTP clients for OpenAI API calls."""
+import functools
+
+import httpx
+
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=64)
+HTTP_TIMEOUT = 60.0
+
+
+@functools.lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Get the process-wide HTTP/2 client.
+
+    Sharing one client keeps connections (and their TLS sessions) alive across embedding and chat calls,
+    and HTTP/2 multiplexes concurrent requests over a single connection.
+
+    :return: Shared httpx client
+    """
+    return httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+
+
+def new_async_http_client() -> httpx.AsyncClient:
+    """Create an HTTP/2 async client.
+
+    Async clients are bound to the event loop they are used in, so callers own and close them.
+
+    :return: New httpx async client
+    """
+    return httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
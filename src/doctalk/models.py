@@ -8,7 +8,7 @@ class Chunk(BaseModel):
     """Represents a document chunk with text, embedding, and metadata."""
 
     text: str = Field(description='Chunk text content')
-    embedding: list[float] = Field(description='Vector embedding')
+    embedding: list[float] = Field(description='Vector embedding (stored as a BSON float32 vector)')
     document_name: str = Field(description='Source document name/path')
     document_id: str = Field(description='Unique document identifier')
     chunk_index: int = Field(description='Index of chunk within document')
@@ -1,15 +1,23 @@
+import hashlib
 import uuid
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from langchain_community.document_loaders import PyPDFLoader, TextLoader
+from langchain_community.document_loaders import PyMuPDFLoader, PyPDFLoader, TextLoader
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from doctalk.embedding import EmbeddingManager
-from doctalk.models import Chunk
+from doctalk.pipeline.splitter import OffsetTextSplitter
 from doctalk.storage import VectorStoreManager
 from docx import Document as DocxDocument
 
+try:
+    import pymupdf  # Optional "pdf" extra
+except ImportError:
+    pymupdf = None
+
 
 class IngestionPipeline:
     """Simple pipeline for ingesting documents into the vector store."""
@@ -20,6 +28,8 @@ class IngestionPipeline:
         vector_store: VectorStoreManager,
         chunk_size: int = 1000,
         chunk_overlap: int = 200,
+        max_workers: int = 8,
+        fast_split: bool = False,
     ):
         """Initialize the ingestion pipeline.
 
@@ -27,18 +37,27 @@ class IngestionPipeline:
         :param vector_store: VectorStoreManager instance
         :param chunk_size: Size of text chunks
         :param chunk_overlap: Overlap between chunks
+        :param max_workers: Number of files ingested concurrently by ingest_batch
+        :param fast_split: Use the offset-based OffsetTextSplitter instead of LangChain's
+            RecursiveCharacterTextSplitter. It is much faster on long texts without newlines (e.g. some PDF
+            extractions) but no faster on text with paragraph breaks, and yields somewhat shorter chunks
         """
         self.embedder = embedder
         self.vector_store = vector_store
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-        )
+        self.max_workers = max_workers
+        if fast_split:
+            self.splitter = OffsetTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        else:
+            self.splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
+            )
 
-    def ingest(self, file_path: str) -> None:
+    def ingest(self, file_path: str) -> str | None:
         """Ingest a single document file.
 
         :param file_path: Path to the document file
+        :return: Generated document ID (usable to restrict searches), or None if the file had no content
         """
         path = Path(file_path)
         if not path.exists():
@@ -46,36 +65,63 @@ class IngestionPipeline:
 
         documents = self._load_document(str(path))
         if not documents:
-            return
+            return None
 
         chunks = self.splitter.split_documents(documents)
 
         texts = [chunk.page_content for chunk in chunks]
-        embeddings = self.embedder.embed_batch(texts)
+        embeddings = self._embed_unique(texts)
 
         document_name = path.name
         document_id = str(uuid.uuid4())
-        chunk_objects = [
-            Chunk(
-                text=chunk.page_content,
-                embedding=embedding,
-                document_name=document_name,
-                document_id=document_id,
-                chunk_index=i,
-                metadata=chunk.metadata,
-            )
+        # Plain dicts with the Chunk schema; they go straight to BSON, so model validation is skipped
+        chunk_dicts = [
+            {
+                'text': chunk.page_content,
+                'embedding': embedding,
+                'document_name': document_name,
+                'document_id': document_id,
+                'chunk_index': i,
+                'metadata': chunk.metadata,
+            }
             for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
         ]
 
-        self.vector_store.insert_chunks(chunk_objects)
+        self.vector_store.insert_chunks(chunk_dicts)
+        return document_id
+
+    def _embed_unique(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, sending each distinct text to the embedder only once.
+
+        Repeated chunks (headers, boilerplate) are common in long documents; duplicates reuse the embedding
+        of their first occurrence.
+
+        :param texts: Texts to embed
+        :return: Embedding for each text, in the same order
+        """
+        hashes = [hashlib.blake2b(text.encode(), digest_size=16).digest() for text in texts]
+        unique_texts = dict(zip(hashes, texts))
+
+        unique_embeddings = self.embedder.embed_batch(list(unique_texts.values()))
+        embedding_by_hash = dict(zip(unique_texts.keys(), unique_embeddings))
+
+        return [embedding_by_hash[text_hash] for text_hash in hashes]
+
+    def ingest_batch(self, file_paths: list[str]) -> Iterator[tuple[str, Exception | None]]:
+        """Ingest multiple document files concurrently, yielding each result as its file finishes.
 
-    def ingest_batch(self, file_paths: list[str]) -> None:
-        """Ingest multiple document files.
+        Files are ingested on a thread pool so that loading, embedding and storage
+        round-trips of different files overlap. A failing file does not stop the batch;
+        its exception is yielded for the caller to report. The batch runs while the
+        result is iterated.
 
         :param file_paths: List of file paths
+        :return: Iterator of (file path, exception raised while ingesting it or None), in completion order
         """
-        for file_path in file_paths:
-            self.ingest(file_path)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.ingest, file_path): file_path for file_path in file_paths}
+            for future in as_completed(futures):
+                yield futures[future], future.exception()
 
     def _load_document(self, file_path: str) -> list[Document]:
         """Load a document using the appropriate LangChain loader.
@@ -87,7 +133,8 @@ class IngestionPipeline:
         suffix = path.suffix.lower()
 
         if suffix == '.pdf':
-            loader = PyPDFLoader(file_path)
+            # PyMuPDF parses in C (and releases the GIL); pypdf is the pure-Python fallback
+            loader = PyMuPDFLoader(file_path) if pymupdf is not None else PyPDFLoader(file_path)
         elif suffix in ['.txt', '.md']:
             loader = TextLoader(file_path, encoding='utf-8')
         elif suffix == '.docx':
@@ -0,0 +1,87 @@
+"""Offset-based text splitter for long documents with few or no newlines."""
+import re
+
+from langchain_core.documents import Document
+
+DEFAULT_SEPARATORS = ('\n\n', '\n', ' ')
+_WHITESPACE = re.compile(r'\s')
+
+
+def split_offsets(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: tuple[str, ...] = DEFAULT_SEPARATORS,
+) -> list[tuple[int, int]]:
+    """Compute (start, end) offsets of overlapping chunks of a text.
+
+    Each chunk is cut after the strongest separator found in the second half of its window, falling back
+    to a hard cut at chunk_size. All scanning is done with str.rfind / regex search, so the Python loop
+    runs once per chunk rather than once per character or split.
+
+    :param text: Text to split
+    :param chunk_size: Maximum chunk length in characters
+    :param chunk_overlap: Number of characters shared by consecutive chunks
+    :param separators: Separators in order of preference
+    :return: List of (start, end) offsets into text
+    """
+    offsets = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            for separator in separators:
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+
+        offsets.append((start, end))
+        if end >= length:
+            break
+
+        # Start the overlap on a word boundary
+        next_start = max(end - chunk_overlap, start + 1)
+        match = _WHITESPACE.search(text, next_start, end)
+        start = match.end() if match else next_start
+
+    return offsets
+
+
+class OffsetTextSplitter:
+    """Splits documents into overlapping chunks using split_offsets."""
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        separators: tuple[str, ...] = DEFAULT_SEPARATORS,
+    ):
+        """Initialize the splitter.
+
+        :param chunk_size: Maximum chunk length in characters
+        :param chunk_overlap: Number of characters shared by consecutive chunks
+        :param separators: Separators in order of preference
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError(f'chunk_overlap ({chunk_overlap}) must be smaller than chunk_size ({chunk_size})')
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = separators
+
+    def split_documents(self, documents: list[Document]) -> list[Document]:
+        """Split documents into chunks, copying each document's metadata to its chunks.
+
+        :param documents: Documents to split
+        :return: Chunk documents
+        """
+        chunks = []
+        for document in documents:
+            text = document.page_content
+            for start, end in split_offsets(text, self.chunk_size, self.chunk_overlap, self.separators):
+                chunk_text = text[start:end].strip()
+                if chunk_text:
+                    chunks.append(Document(page_content=chunk_text, metadata=dict(document.metadata)))
+        return chunks
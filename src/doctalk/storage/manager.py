@@ -1,11 +1,82 @@
+import functools
+import logging
+import threading
+import time
 from typing import Any
 
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
 from pymongo import MongoClient
 from pymongo.collection import Collection
 from pymongo.database import Database
+from pymongo.errors import CollectionInvalid, OperationFailure
+from pymongo.operations import SearchIndexModel
 
 from doctalk.models import Chunk
 
+logger = logging.getLogger(__name__)
+
+MAX_NUM_CANDIDATES = 10000
+MIN_NUM_CANDIDATES = 50
+DEFAULT_MAX_POOL_SIZE = 100
+INDEX_POLL_INTERVAL = 5.0
+
+
+@functools.lru_cache(maxsize=16)
+def _get_client(mongodb_uri: str, max_pool_size: int) -> MongoClient:
+    """Get a process-wide MongoClient for a URI, so all managers share one connection pool.
+
+    :param mongodb_uri: MongoDB connection URI
+    :param max_pool_size: Maximum number of pooled connections
+    :return: Shared MongoClient
+    """
+    return MongoClient(
+        mongodb_uri,
+        maxPoolSize=max_pool_size,
+        retryWrites=True,
+        compressors="zstd,zlib",
+    )
+
+
+def to_bson_vector(embedding: list[float]) -> Binary:
+    """Encode an embedding as a BSON float32 vector (binData subtype 9).
+
+    Packed float32 vectors take half the space of BSON double arrays, both on the wire and at rest.
+
+    :param embedding: Embedding vector
+    :return: BSON Binary vector
+    """
+    return Binary.from_vector(embedding, BinaryVectorDtype.FLOAT32)
+
+
+def from_bson_vector(value: Binary | list[float]) -> np.ndarray:
+    """Decode a stored embedding into a float32 array.
+
+    :param value: BSON float32 vector, or a legacy array of doubles
+    :return: 1-D float32 array
+    """
+    if isinstance(value, Binary):
+        # Skip the two header bytes (dtype, padding) of the vector subtype
+        return np.frombuffer(value, dtype='<f4', offset=2)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _missing_index_fields(existing: dict[str, Any], expected: dict[str, Any]) -> list[dict[str, Any]]:
+    """Find expected index fields that an existing index definition does not declare with the expected settings.
+
+    Extra keys added by Atlas to existing fields are ignored.
+
+    :param existing: Definition reported by Atlas
+    :param expected: Desired definition
+    :return: Expected field definitions missing from the existing index (empty if it is up to date)
+    """
+    existing_fields = existing.get("fields", [])
+    return [
+        expected_field
+        for expected_field in expected["fields"]
+        if not any(all(field.get(key) == value for key, value in expected_field.items()) for field in existing_fields)
+    ]
+
 
 class VectorStoreManager:
     """Manages MongoDB vector store operations for document chunks."""
@@ -16,6 +87,14 @@ class VectorStoreManager:
         db_name: str = "doctalk",
         collection_name: str = "chunks",
         vector_index_name: str = "vector_index",
+        num_dimensions: int = 1536,
+        quantization: str | None = "scalar",
+        default_num_candidates: int | None = None,
+        max_pool_size: int = DEFAULT_MAX_POOL_SIZE,
+        ensure_index: bool = True,
+        update_index: bool = False,
+        wait_for_index_ready: bool = True,
+        index_ready_timeout: float = 300.0,
     ):
         """Initialize the vector store manager.
 
@@ -23,65 +102,326 @@ class VectorStoreManager:
         :param db_name: Database name
         :param collection_name: Collection name for storing chunks
         :param vector_index_name: Name of the vector search index
+        :param num_dimensions: Dimensionality of the stored embeddings
+        :param quantization: Atlas vector quantization ("scalar" for int8, "binary", or None for full float32)
+        :param default_num_candidates: numCandidates used when a search does not pass one
+            (if None, 10x the limit with a floor of MIN_NUM_CANDIDATES)
+        :param max_pool_size: Maximum size of the MongoDB connection pool (should cover concurrent workers)
+        :param ensure_index: Create the vector search index if it is missing, and validate it, on first collection access
+        :param update_index: Rebuild an existing index whose definition differs instead of only warning about it
+        :param wait_for_index_ready: Block until the vector search index is queryable when ensuring it
+        :param index_ready_timeout: Maximum seconds to wait for the index to become queryable
         """
         self.mongodb_uri = mongodb_uri
         self.db_name = db_name
         self.collection_name = collection_name
         self.vector_index_name = vector_index_name
+        self.num_dimensions = num_dimensions
+        self.quantization = quantization
+        self.default_num_candidates = default_num_candidates
+        self.max_pool_size = max_pool_size
+        self.ensure_index = ensure_index
+        self.update_index = update_index
+        self.wait_for_index_ready = wait_for_index_ready
+        self.index_ready_timeout = index_ready_timeout
         self._client: MongoClient | None = None
         self._db: Database | None = None
         self._collection: Collection | None = None
+        self._collection_lock = threading.Lock()
 
     @property
     def collection(self) -> Collection:
-        """Get or create collection."""
+        """Get or create collection, ensuring the vector search index on first access."""
         if self._collection is None:
-            self._client = MongoClient(self.mongodb_uri)
-            self._db = self._client[self.db_name]
-            self._collection = self._db[self.collection_name]
+            with self._collection_lock:
+                if self._collection is None:
+                    collection = self._connect()
+                    if self.ensure_index:
+                        self._ensure_vector_index(collection)
+                    self._collection = collection
         return self._collection
 
-    def insert_chunks(self, chunks: list[Chunk]) -> None:
+    def ensure_vector_index(self) -> None:
+        """Create the vector search index if it is missing and validate an existing one.
+
+        An outdated existing index is only rebuilt when update_index is True; otherwise a warning names the
+        missing fields. This is idempotent and runs automatically on first collection access unless
+        ensure_index is False.
+        """
+        with self._collection_lock:
+            collection = self._collection if self._collection is not None else self._connect()
+            self._ensure_vector_index(collection)
+            self._collection = collection
+
+    def _connect(self) -> Collection:
+        """Open the shared client and return the chunks collection without any index checks.
+
+        :return: Chunks collection
+        """
+        self._client = _get_client(self.mongodb_uri, self.max_pool_size)
+        self._db = self._client[self.db_name]
+        return self._db[self.collection_name]
+
+    def _ensure_vector_index(self, collection: Collection) -> None:
+        """Create (or, if enabled, update) the vector search index, optionally waiting until it is queryable.
+
+        The wait also covers an existing index that is still building, e.g. one just created by another process.
+
+        :param collection: Chunks collection
+        """
+        if self.collection_name not in collection.database.list_collection_names():
+            try:
+                collection.database.create_collection(self.collection_name)
+            except CollectionInvalid:
+                pass  # Created concurrently by another process
+
+        definition = self.vector_index_definition()
+        indexes = list(collection.list_search_indexes(name=self.vector_index_name))
+
+        if not indexes:
+            logger.info(f'Creating vector search index {self.vector_index_name!r} on {self.collection_name!r}')
+            try:
+                collection.create_search_index(
+                    SearchIndexModel(definition=definition, name=self.vector_index_name, type="vectorSearch")
+                )
+            except OperationFailure as e:
+                # Another process created it first; wait for that index instead
+                logger.info(f'Vector search index {self.vector_index_name!r} was not created: {e}')
+        else:
+            missing_fields = _missing_index_fields(indexes[0].get("latestDefinition", {}), definition)
+            if missing_fields and not self.update_index:
+                logger.warning(
+                    f'Vector search index {self.vector_index_name!r} on {self.collection_name!r} does not match '
+                    f'the expected definition; missing fields: {missing_fields}. '
+                    f'Pass update_index=True to rebuild it.'
+                )
+            elif missing_fields:
+                logger.info(f'Updating vector search index {self.vector_index_name!r} on {self.collection_name!r}')
+                collection.update_search_index(self.vector_index_name, definition)
+
+        if self.wait_for_index_ready:
+            self._wait_for_index_ready(collection)
+
+    def _wait_for_index_ready(self, collection: Collection) -> None:
+        """Poll until the vector search index is queryable.
+
+        :param collection: Chunks collection
+        """
+        deadline = time.monotonic() + self.index_ready_timeout
+        while True:
+            indexes = list(collection.list_search_indexes(name=self.vector_index_name))
+            if indexes and indexes[0].get("queryable") and indexes[0].get("status") == "READY":
+                return
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(INDEX_POLL_INTERVAL)
+
+        raise TimeoutError(
+            f'Vector search index {self.vector_index_name!r} not ready after {self.index_ready_timeout} seconds'
+        )
+
+    def vector_index_definition(self) -> dict[str, Any]:
+        """Build the Atlas Vector Search index definition for the chunks collection.
+
+        With scalar quantization Atlas builds the HNSW graph over int8 vectors (4x smaller than float32)
+        while keeping the full-fidelity vectors on disk for rescoring.
+
+        document_id and document_name are declared as filter fields so searches can pre-filter on them.
+
+        :return: Index definition for the vectorSearch index
+        """
+        vector_field = {
+            "type": "vector",
+            "path": "embedding",
+            "numDimensions": self.num_dimensions,
+            "similarity": "cosine",
+        }
+        if self.quantization:
+            vector_field["quantization"] = self.quantization
+
+        return {
+            "fields": [
+                vector_field,
+                {"type": "filter", "path": "document_id"},
+                {"type": "filter", "path": "document_name"},
+            ],
+        }
+
+    def insert_chunks(self, chunks: list[Chunk | dict[str, Any]]) -> None:
         """Insert chunks with embeddings into the vector store.
 
-        :param chunks: List of Chunk model instances
+        :param chunks: List of Chunk model instances or dicts following the Chunk schema
         """
         if not chunks:
             return
 
-        chunk_dicts = [chunk.model_dump() for chunk in chunks]
-        self.collection.insert_many(chunk_dicts)
+        chunk_dicts = []
+        for chunk in chunks:
+            chunk_dict = chunk.model_dump() if isinstance(chunk, Chunk) else dict(chunk)
+            chunk_dict["embedding"] = to_bson_vector(chunk_dict["embedding"])
+            chunk_dicts.append(chunk_dict)
+
+        # Unordered inserts let the server apply documents in parallel and continue past individual failures;
+        # PyMongo already splits the call by maxWriteBatchSize / maxMessageSizeBytes
+        self.collection.insert_many(chunk_dicts, ordered=False, bypass_document_validation=True)
 
     def vector_search(
         self,
         query_embedding: list[float],
         limit: int = 5,
-        num_candidates: int = 50,
+        num_candidates: int | None = None,
+        max_text_chars: int | None = None,
+        pre_filter: dict[str, Any] | None = None,
     ) -> list[dict[str, Any]]:
         """Perform vector similarity search.
 
         :param query_embedding: Query vector embedding
         :param limit: Maximum number of results to return
-        :param num_candidates: Number of candidates to consider (higher = more accurate but slower)
-        :return: List of matching chunks with text, score, and metadata
+        :param num_candidates: Number of candidates to consider (higher = more accurate but slower;
+            defaults to default_num_candidates or 10x the limit)
+        :param max_text_chars: If set, truncate the returned text to this many characters on the server
+        :param pre_filter: MQL filter on document_id / document_name applied during the index traversal
+        :return: List of matching chunks with text, score and document fields
         """
-        pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": self.vector_index_name,
-                    "path": "embedding",
-                    "queryVector": query_embedding,
-                    "numCandidates": num_candidates,
-                    "limit": limit,
-                },
-            },
-            {
-                "$project": {
-                    "_id": 1,
-                    "embedding": 0,
-                    "score": {"$meta": "vectorSearchScore"},
-                },
-            },
+        pipeline = self._search_pipeline(
+            query_embedding,
+            limit,
+            num_candidates,
+            max_text_chars=max_text_chars,
+            pre_filter=pre_filter,
+        )
+        return list(self.collection.aggregate(pipeline))
+
+    def vector_search_with_embeddings(
+        self,
+        query_embedding: list[float],
+        limit: int = 5,
+        num_candidates: int | None = None,
+        pre_filter: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Perform vector similarity search, returning the stored embeddings as well.
+
+        :param query_embedding: Query vector embedding
+        :param limit: Maximum number of results to return
+        :param num_candidates: Number of candidates to consider (higher = more accurate but slower;
+            defaults to default_num_candidates or 10x the limit)
+        :param pre_filter: MQL filter on document_id / document_name applied during the index traversal
+        :return: List of matching chunks with text, score, document fields and float32 embedding
+        """
+        pipeline = self._search_pipeline(
+            query_embedding,
+            limit,
+            num_candidates,
+            include_embedding=True,
+            pre_filter=pre_filter,
+        )
+
+        chunks = list(self.collection.aggregate(pipeline))
+        for chunk in chunks:
+            chunk["embedding"] = from_bson_vector(chunk["embedding"])
+        return chunks
+
+    def tune_num_candidates(
+        self,
+        query_embeddings: list[list[float]],
+        limit: int = 5,
+        candidate_values: tuple[int, ...] = (50, 100, 200, 400, 800, 1600),
+        target_recall: float = 0.95,
+    ) -> int:
+        """Pick the smallest numCandidates whose approximate search reaches the target recall.
+
+        Recall@limit is measured against exact (ENN) search over the same index for the given queries.
+
+        :param query_embeddings: Representative query embeddings
+        :param limit: Number of results per query
+        :param candidate_values: numCandidates values to try; values below limit are skipped
+        :param target_recall: Mean recall@limit required
+        :return: Smallest sufficient numCandidates, or the largest value tried if none reaches the target
+        :raises ValueError: If there are no queries or no candidate value of at least limit
+        """
+        if not query_embeddings:
+            raise ValueError('query_embeddings must not be empty')
+        usable_values = sorted(value for value in candidate_values if value >= limit)
+        if not usable_values:
+            raise ValueError(f'candidate_values must contain a value of at least limit ({limit})')
+
+        exact_ids = [
+            {chunk["chunk_id"] for chunk in self.collection.aggregate(self._search_pipeline(query, limit, exact=True))}
+            for query in query_embeddings
         ]
 
-        return list(self.collection.aggregate(pipeline))
+        for num_candidates in usable_values:
+            recalls = []
+            for query, expected in zip(query_embeddings, exact_ids):
+                pipeline = self._search_pipeline(query, limit, num_candidates)
+                found = {chunk["chunk_id"] for chunk in self.collection.aggregate(pipeline)}
+                recalls.append(len(found & expected) / len(expected) if expected else 1.0)
+
+            if sum(recalls) / len(recalls) >= target_recall:
+                return num_candidates
+
+        return usable_values[-1]
+
+    def _resolve_num_candidates(self, limit: int, num_candidates: int | None) -> int:
+        """Resolve numCandidates for a search, following Atlas's guidance of 10-20x the limit.
+
+        :param limit: Maximum number of results to return
+        :param num_candidates: Explicitly requested numCandidates, if any
+        :return: numCandidates clamped to the range Atlas accepts
+        """
+        num_candidates = num_candidates or self.default_num_candidates or max(limit * 10, MIN_NUM_CANDIDATES)
+        return min(max(num_candidates, limit), MAX_NUM_CANDIDATES)
+
+    def _search_pipeline(
+        self,
+        query_embedding: list[float],
+        limit: int,
+        num_candidates: int | None = None,
+        include_embedding: bool = False,
+        max_text_chars: int | None = None,
+        exact: bool = False,
+        pre_filter: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Build the $vectorSearch aggregation pipeline.
+
+        The projection is inclusion-only and returns just the fields needed to build retrieved chunks,
+        with the ObjectId already converted to a string chunk_id.
+
+        :param query_embedding: Query vector embedding
+        :param limit: Maximum number of results to return
+        :param num_candidates: Number of candidates to consider
+        :param include_embedding: Whether to return the stored embedding
+        :param max_text_chars: If set, truncate the returned text to this many characters
+        :param exact: Run an exact nearest neighbour search instead of HNSW
+        :param pre_filter: MQL filter on indexed filter fields
+        :return: Aggregation pipeline
+        """
+        projection = {
+            "_id": 0,
+            "chunk_id": {"$toString": "$_id"},
+            "text": 1 if max_text_chars is None else {"$substrCP": ["$text", 0, max_text_chars]},
+            "document_name": 1,
+            "document_id": 1,
+            "chunk_index": 1,
+            "score": {"$meta": "vectorSearchScore"},
+        }
+        if include_embedding:
+            projection["embedding"] = 1
+
+        vector_search = {
+            "index": self.vector_index_name,
+            "path": "embedding",
+            "queryVector": to_bson_vector(query_embedding),
+            "limit": limit,
+        }
+        if pre_filter:
+            vector_search["filter"] = pre_filter
+        if exact:
+            vector_search["exact"] = True
+        else:
+            vector_search["numCandidates"] = self._resolve_num_candidates(limit, num_candidates)
+
+        return [
+            {"$vectorSearch": vector_search},
+            {"$project": projection},
+        ]
@@ -0,0 +1,56 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from doctalk.embedding import manager
+from doctalk.embedding.manager import EmbeddingManager
+
+
+class FakeAsyncOpenAI:
+    """Stands in for AsyncOpenAI, tracking how many embedding requests are in flight at once."""
+
+    in_flight = 0
+    max_in_flight = 0
+
+    def __init__(self, api_key=None, http_client=None):
+        self.http_client = http_client
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.http_client.aclose()
+
+    async def _create(self, model: str, input: list[str]):
+        cls = type(self)
+        cls.in_flight += 1
+        cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        await asyncio.sleep(0.01)
+        cls.in_flight -= 1
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=[float(len(text))]) for text in input],
+            usage=SimpleNamespace(total_tokens=len(input)),
+        )
+
+
+def test_embed_batch_bounds_concurrency_and_keeps_order(monkeypatch):
+    monkeypatch.setattr(manager, 'AsyncOpenAI', FakeAsyncOpenAI)
+    embedder = EmbeddingManager(api_key='test', batch_size=2, max_concurrency=3)
+    texts = ['x' * n for n in range(1, 21)]
+
+    embeddings = embedder.embed_batch(texts)
+
+    assert embeddings == [[float(n)] for n in range(1, 21)]
+    assert FakeAsyncOpenAI.max_in_flight == 3
+
+
+def test_embed_batch_rejects_running_event_loop():
+    embedder = EmbeddingManager(api_key='test')
+
+    async def call_from_loop():
+        embedder.embed_batch(['text'])
+
+    with pytest.raises(RuntimeError, match='running event loop'):
+        asyncio.run(call_from_loop())
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from doctalk.pipeline import IngestionPipeline, ingestion
+
+SAMPLE_DOCUMENTS = Path(__file__).parent.parent / 'sample_documents'
+
+
+class FakeEmbedder:
+    """Records embed_batch calls and embeds each text as [len(text), index of the call]."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(i)] for i, text in enumerate(texts)]
+
+
+def test_embed_unique_embeds_each_distinct_text_once():
+    embedder = FakeEmbedder()
+    pipeline = IngestionPipeline(embedder, vector_store=None)
+    texts = ['header', 'body one', 'header', 'body two', 'body one', 'footer', 'header']
+
+    embeddings = pipeline._embed_unique(texts)
+
+    assert embedder.calls == [['header', 'body one', 'body two', 'footer']]
+    unique_embeddings = {'header': [6.0, 0.0], 'body one': [8.0, 1.0], 'body two': [8.0, 2.0], 'footer': [6.0, 3.0]}
+    assert embeddings == [unique_embeddings[text] for text in texts]
+
+
+class FailingPipeline(IngestionPipeline):
+    """Pipeline whose ingest fails for files named 'bad*'."""
+
+    def ingest(self, file_path: str) -> str:
+        if file_path.startswith('bad'):
+            raise ValueError(f'cannot ingest {file_path}')
+        return file_path
+
+
+def test_ingest_batch_yields_every_file_with_its_error():
+    pipeline = FailingPipeline(FakeEmbedder(), vector_store=None, max_workers=2)
+
+    results = dict(pipeline.ingest_batch(['a.md', 'bad.pdf', 'b.txt']))
+
+    assert set(results) == {'a.md', 'bad.pdf', 'b.txt'}
+    assert results['a.md'] is None and results['b.txt'] is None
+    assert isinstance(results['bad.pdf'], ValueError)
+
+
+def test_pdf_loading_falls_back_to_pypdf_without_pymupdf(monkeypatch):
+    monkeypatch.setattr(ingestion, 'pymupdf', None)
+    pipeline = IngestionPipeline(FakeEmbedder(), vector_store=None)
+
+    documents = pipeline._load_document(str(SAMPLE_DOCUMENTS / 'neural_interface_spec.pdf'))
+
+    assert documents
+    assert any(document.page_content.strip() for document in documents)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from doctalk.agents.rag_agent import _rerank
+
+
+def _chunk(chunk_id: str, embedding: list[float]) -> dict:
+    return {'chunk_id': chunk_id, 'score': 0.0, 'embedding': np.asarray(embedding, dtype=np.float32)}
+
+
+def test_rerank_orders_by_cosine_and_keeps_top_k():
+    chunks = [
+        _chunk('orthogonal', [0.0, 1.0]),
+        _chunk('same', [2.0, 0.0]),
+        _chunk('opposite', [-1.0, 0.0]),
+        _chunk('close', [1.0, 1.0]),
+    ]
+
+    reranked = _rerank([1.0, 0.0], chunks, top_k=3)
+
+    assert [chunk['chunk_id'] for chunk in reranked] == ['same', 'close', 'orthogonal']
+
+
+def test_rerank_scores_use_atlas_scale():
+    chunks = [_chunk('same', [3.0, 0.0]), _chunk('orthogonal', [0.0, 1.0]), _chunk('opposite', [-1.0, 0.0])]
+
+    scores = {chunk['chunk_id']: chunk['score'] for chunk in _rerank([1.0, 0.0], chunks, top_k=3)}
+
+    # (1 + cosine) / 2
+    assert scores == pytest.approx({'same': 1.0, 'orthogonal': 0.5, 'opposite': 0.0}, abs=1e-6)
+
+
+def test_rerank_without_candidates_returns_nothing():
+    assert _rerank([1.0, 0.0], [], top_k=5) == []
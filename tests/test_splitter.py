@@ -0,0 +1,49 @@
+import random
+from itertools import pairwise
+
+import pytest
+from langchain_core.documents import Document
+
+from doctalk.pipeline.splitter import OffsetTextSplitter, split_offsets
+
+
+def _random_text(seed: int, n_words: int = 2000) -> str:
+    rng = random.Random(seed)
+    words = [''.join(rng.choice('abcdefg') for _ in range(rng.randint(1, 12))) for _ in range(n_words)]
+    return ''.join(word + rng.choice([' ', ' ', ' ', '\n', '\n\n']) for word in words)
+
+
+def test_empty_text_returns_no_offsets():
+    assert split_offsets('', chunk_size=100, chunk_overlap=20) == []
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('chunk_size, chunk_overlap', [(1000, 200), (200, 50), (100, 0)])
+def test_offsets_cover_text_within_chunk_size(seed, chunk_size, chunk_overlap):
+    text = _random_text(seed)
+    offsets = split_offsets(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+    assert offsets[0][0] == 0
+    assert offsets[-1][1] == len(text)
+    assert all(end - start <= chunk_size for start, end in offsets)
+    for (prev_start, prev_end), (next_start, _) in pairwise(offsets):
+        assert prev_start < next_start <= prev_end
+
+
+def test_zero_overlap_without_separators_cuts_at_chunk_size():
+    assert split_offsets('x' * 250, chunk_size=100, chunk_overlap=0) == [(0, 100), (100, 200), (200, 250)]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        OffsetTextSplitter(chunk_size=100, chunk_overlap=100)
+
+
+def test_split_documents_copies_metadata():
+    document = Document(page_content=_random_text(0, n_words=500), metadata={'source': 'doc.md', 'page': 3})
+
+    chunks = OffsetTextSplitter(chunk_size=200, chunk_overlap=50).split_documents([document])
+
+    assert len(chunks) > 1
+    assert all(chunk.metadata == {'source': 'doc.md', 'page': 3} for chunk in chunks)
+    assert all(chunk.metadata is not document.metadata for chunk in chunks)
@@ -0,0 +1,182 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pymongo.errors import OperationFailure
+
+from doctalk.storage import manager
+from doctalk.storage.manager import VectorStoreManager
+
+
+class FakeIndexCollection:
+    """Minimal collection exposing the search index API, with scripted index listings."""
+
+    def __init__(self, listings: list[list[dict]], create_error: Exception | None = None):
+        self.listings = listings
+        self.create_error = create_error
+        self.created = []
+        self.updated = []
+        self.database = SimpleNamespace(list_collection_names=lambda: ['chunks'])
+
+    def list_search_indexes(self, name: str) -> list[dict]:
+        return self.listings.pop(0) if len(self.listings) > 1 else self.listings[0]
+
+    def create_search_index(self, model) -> None:
+        self.created.append(model)
+        if self.create_error is not None:
+            raise self.create_error
+
+    def update_search_index(self, name: str, definition: dict) -> None:
+        self.updated.append(definition)
+
+
+def _index(store: VectorStoreManager, status: str, queryable: bool) -> dict:
+    return {'latestDefinition': store.vector_index_definition(), 'status': status, 'queryable': queryable}
+
+
+@pytest.fixture(autouse=True)
+def no_poll_delay(monkeypatch):
+    monkeypatch.setattr(manager, 'INDEX_POLL_INTERVAL', 0)
+
+
+def test_matching_index_still_building_is_waited_for():
+    store = VectorStoreManager('mongodb://unused')
+    collection = FakeIndexCollection([
+        [_index(store, 'BUILDING', False)],
+        [_index(store, 'BUILDING', False)],
+        [_index(store, 'READY', True)],
+    ])
+
+    store._ensure_vector_index(collection)
+
+    assert collection.listings == [[_index(store, 'READY', True)]]
+    assert not collection.created and not collection.updated
+
+
+def test_concurrent_index_creation_falls_through_to_wait():
+    store = VectorStoreManager('mongodb://unused')
+    collection = FakeIndexCollection(
+        [[], [_index(store, 'READY', True)]],
+        create_error=OperationFailure('Duplicate Index'),
+    )
+
+    store._ensure_vector_index(collection)
+
+    assert len(collection.created) == 1
+
+
+def test_index_not_ready_before_timeout_raises():
+    store = VectorStoreManager('mongodb://unused', index_ready_timeout=0)
+    collection = FakeIndexCollection([[_index(store, 'BUILDING', False)]])
+
+    with pytest.raises(TimeoutError):
+        store._ensure_vector_index(collection)
+
+
+def test_outdated_index_is_not_rebuilt_by_default():
+    store = VectorStoreManager('mongodb://unused')
+    collection = FakeIndexCollection([[{'latestDefinition': {'fields': []}, 'status': 'READY', 'queryable': True}]])
+
+    store._ensure_vector_index(collection)
+
+    assert not collection.updated
+
+
+def test_bson_vector_round_trip():
+    embedding = [1.0, -2.5, 0.125, 3.0]
+
+    vector = manager.to_bson_vector(embedding)
+
+    # binData subtype 9 with a float32 dtype byte and zero padding ahead of the packed values
+    assert vector.subtype == 9
+    assert bytes(vector[:2]) == b'\x27\x00'
+    assert len(vector) == 2 + 4 * len(embedding)
+    decoded = manager.from_bson_vector(vector)
+    assert decoded.dtype == np.float32
+    assert decoded.tolist() == embedding
+
+
+def test_from_bson_vector_accepts_legacy_arrays():
+    decoded = manager.from_bson_vector([1.0, 2.0])
+
+    assert decoded.dtype == np.float32
+    assert decoded.tolist() == [1.0, 2.0]
+
+
+def test_missing_index_fields_ignores_extra_atlas_keys():
+    expected = VectorStoreManager('mongodb://unused').vector_index_definition()
+    existing = {
+        'fields': [
+            {**field, 'indexingMethod': 'hnsw', 'hnswOptions': {'maxEdges': 16}} for field in expected['fields']
+        ],
+    }
+
+    assert manager._missing_index_fields(existing, expected) == []
+
+
+def test_missing_index_fields_reports_absent_and_changed_fields():
+    store = VectorStoreManager('mongodb://unused')
+    expected = store.vector_index_definition()
+    vector_field = {**expected['fields'][0], 'quantization': 'binary'}
+    existing = {'fields': [vector_field, {'type': 'filter', 'path': 'document_id'}]}
+
+    missing = manager._missing_index_fields(existing, expected)
+
+    assert missing == [expected['fields'][0], {'type': 'filter', 'path': 'document_name'}]
+
+
+# Canned approximate results per numCandidates; the exact top 5 is always chunks 1-5
+ANN_RESULTS = {50: [1, 2, 3, 8, 9], 100: [1, 2, 3, 4, 9], 200: [1, 2, 3, 4, 5]}
+
+
+class FakeSearchCollection:
+    """Collection whose aggregate returns canned chunk IDs, with ANN recall growing with numCandidates."""
+
+    def __init__(self):
+        self.num_candidates_seen = []
+
+    def aggregate(self, pipeline: list[dict]) -> list[dict]:
+        vector_search = pipeline[0]['$vectorSearch']
+        if vector_search.get('exact'):
+            ids = [1, 2, 3, 4, 5]
+        else:
+            self.num_candidates_seen.append(vector_search['numCandidates'])
+            ids = ANN_RESULTS.get(vector_search['numCandidates'], [1, 2, 3, 4, 5])
+        return [{'chunk_id': str(chunk_id)} for chunk_id in ids]
+
+
+def _tuning_store() -> tuple[VectorStoreManager, FakeSearchCollection]:
+    store = VectorStoreManager('mongodb://unused')
+    collection = FakeSearchCollection()
+    store._collection = collection
+    return store, collection
+
+
+def test_tune_num_candidates_picks_smallest_value_reaching_target():
+    store, collection = _tuning_store()
+
+    chosen = store.tune_num_candidates([[1.0, 0.0], [0.0, 1.0]], limit=5, candidate_values=(400, 50, 200, 100))
+
+    assert chosen == 200
+    assert collection.num_candidates_seen == [50, 50, 100, 100, 200, 200]
+
+
+def test_tune_num_candidates_returns_largest_value_when_target_not_reached():
+    store, _ = _tuning_store()
+
+    assert store.tune_num_candidates([[1.0, 0.0]], limit=5, candidate_values=(2, 50, 100), target_recall=0.95) == 100
+
+
+@pytest.mark.parametrize('candidate_values', [(), (1, 2, 3)])
+def test_tune_num_candidates_rejects_unusable_candidate_values(candidate_values):
+    store, _ = _tuning_store()
+
+    with pytest.raises(ValueError):
+        store.tune_num_candidates([[1.0, 0.0]], limit=5, candidate_values=candidate_values)
+
+
+def test_tune_num_candidates_rejects_empty_queries():
+    store, _ = _tuning_store()
+
+    with pytest.raises(ValueError):
+        store.tune_num_candidates([], limit=5)